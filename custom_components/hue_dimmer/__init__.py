@@ -1,14 +1,23 @@
+import asyncio
 import logging
 import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import lru_cache
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import Event, HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
 from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.event import async_track_state_change_event, async_track_time_interval
 from homeassistant.helpers.service import async_extract_entity_ids
 from homeassistant.util.color import color_hs_to_xy, color_RGB_to_xy, color_xy_to_hs, color_xy_to_RGB
 
 from .const import (
     API_SETTLE_SECONDS,
+    BRIGHTNESS_CACHE_MAX_ENTRIES,
+    BRIGHTNESS_CACHE_PRUNE_SECONDS,
     DEFAULT_MAX_BRIGHTNESS,
     DEFAULT_MIN_BRIGHTNESS,
     DEFAULT_SWEEP_TIME,
@@ -16,35 +25,89 @@ from .const import (
     DIR_NONE,
     DIR_UP,
     DOMAIN,
+    MAX_CONCURRENT_REQUESTS,
     SERVICE_GET_ATTRIBUTES,
     SERVICE_LOWER,
     SERVICE_RAISE,
     SERVICE_SET_ATTRIBUTES,
     SERVICE_STOP,
+    SET_ATTRIBUTES_DEDUPE_SECONDS,
+    TRANSITION_DEBOUNCE_SECONDS,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
-# { entity_id: { "time": float, "bright": float, "target": float, "dir": str, "sweep": float } }
-_brightness_cache = {}
 
+@dataclass(slots=True)
+class CacheEntry:
+    # Brightness snapshot taken when a transition starts or stops.
+    mtime: float  # time.monotonic(), so guard windows are immune to wall-clock adjustments
+    bright: float
+    target: float
+    dir: int
+    sweep: float
+    sign: float = 0.0  # +1.0 raising, -1.0 lowering, 0.0 stopped
 
-def resolve_entity(hass: HomeAssistant, entity_id: str):
-    # Retrieves the Hue Bridge instance and Resource UUID, ensuring it supports V2 API.
+
+# { entity_id: CacheEntry }, least recently written first
+_brightness_cache = OrderedDict()
+
+# { entity_id: (hue_config_entry, resource_type, resource_id) }
+_entity_resolve_cache = {}
+
+# { entity_id: (supports_color_temp, min_color_temp_kelvin, max_color_temp_kelvin) }
+_ct_caps_cache = {}
+
+# { entity_id: unsubscribe } for the state listener that keeps each _ct_caps_cache entry current
+_ct_caps_unsub = {}
+
+# { resource_id: (time.monotonic(), (brightness, color_temp_mirek, color_xy)) } of the last set_attributes
+_last_payload = {}
+
+
+def _lookup_entity(hass: HomeAssistant, entity_id: str, ent_reg: er.EntityRegistry, state):
+    # Walk the entity registry to find the Hue config entry and resource behind an entity.
     from homeassistant.components.hue.const import DOMAIN as HUE_DOMAIN
 
-    ent_reg = er.async_get(hass)
     entry = ent_reg.async_get(entity_id)
 
     if not entry:
         _LOGGER.error("Entity %s not found in entity registry.", entity_id)
-        return None, None, None
+        return None
 
     config_entry = hass.config_entries.async_get_entry(entry.config_entry_id)
     if not config_entry or config_entry.domain != HUE_DOMAIN:
         _LOGGER.error("Entity %s is not a Philips Hue entity.", entity_id)
+        return None
+
+    # Unique IDs may carry a prefix ("<prefix>:<uuid>"); keep the part after the last colon
+    resource_id = entry.unique_id.rpartition(":")[2]
+
+    if state is None:
+        state = hass.states.get(entity_id)
+    is_group = bool(state and state.attributes.get("is_hue_group"))
+    resource_type = "grouped_light" if is_group else "light"
+
+    resolved = (config_entry, resource_type, resource_id)
+    # Group-ness comes from the is_hue_group extra state attribute, which HA omits while the
+    # entity is unavailable or restored, so only cache once the entity reports a real state.
+    if state and state.state not in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+        _entity_resolve_cache[entity_id] = resolved
+    return resolved
+
+
+def resolve_entity(hass: HomeAssistant, entity_id: str, ent_reg: er.EntityRegistry | None = None, state=None):
+    # Retrieves the Hue Bridge instance and Resource UUID, ensuring it supports V2 API.
+    # The bridge is read from the config entry on every call, so a reloaded Hue integration
+    # is picked up even when the registry lookup is served from cache. Service handlers pass
+    # in the entity registry and state they already hold, to avoid fetching them per helper.
+    resolved = _entity_resolve_cache.get(entity_id) or _lookup_entity(
+        hass, entity_id, ent_reg or er.async_get(hass), state
+    )
+    if not resolved:
         return None, None, None
 
+    config_entry, resource_type, resource_id = resolved
     bridge = getattr(config_entry, "runtime_data", None)
 
     if not bridge:
@@ -56,15 +119,6 @@ def resolve_entity(hass: HomeAssistant, entity_id: str):
         _LOGGER.error("Hue Smooth Dimmer requires a Bridge V2 or Bridge Pro for %s", entity_id)
         return None, None, None
 
-    resource_id = entry.unique_id
-
-    if ":" in resource_id:
-        resource_id = resource_id.split(":")[-1]
-
-    state = hass.states.get(entity_id)
-    is_group = bool(state and state.attributes.get("is_hue_group"))
-    resource_type = "grouped_light" if is_group else "light"
-
     return bridge, resource_type, resource_id
 
 
@@ -74,143 +128,222 @@ def _get_controller(bridge, resource_type):
     return bridge.api.lights
 
 
-def _get_ha_brightness(hass: HomeAssistant, entity_id: str):
+def _cache_brightness(entity_id: str, entry: CacheEntry):
+    # Store an entry, evicting the least recently written one if the cache is full.
+    _brightness_cache[entity_id] = entry
+    _brightness_cache.move_to_end(entity_id)
+    if len(_brightness_cache) > BRIGHTNESS_CACHE_MAX_ENTRIES:
+        _brightness_cache.popitem(last=False)
+
+
+def _guard_seconds(entry: CacheEntry):
+    # Dynamic guard window: sweep duration + API settle buffer for active transitions,
+    # just the settle buffer for stopped entries.
+    return entry.sweep + API_SETTLE_SECONDS if entry.dir != DIR_NONE else API_SETTLE_SECONDS
+
+
+def _prune_brightness_cache(now: float):
+    # Drop entries whose guard window has expired. resolve_brightness prunes lazily, but
+    # entities that are never queried again would otherwise stay cached forever.
+    expired = [eid for eid, entry in _brightness_cache.items() if now - entry.mtime > _guard_seconds(entry)]
+    for entity_id in expired:
+        del _brightness_cache[entity_id]
+
+
+def _prune_last_payload(now: float):
+    # Drop payloads older than the dedupe window; they can no longer suppress anything.
+    expired = [rid for rid, (sent, _) in _last_payload.items() if now - sent >= SET_ATTRIBUTES_DEDUPE_SECONDS]
+    for resource_id in expired:
+        del _last_payload[resource_id]
+
+
+def _get_ha_brightness(hass: HomeAssistant, entity_id: str, state=None):
     # Read brightness from HA entity state (0-255) and convert to Hue percentage (0-100).
-    state = hass.states.get(entity_id)
+    if state is None:
+        state = hass.states.get(entity_id)
     if not state:
         return 0.0
     ha_bright = state.attributes.get("brightness")
     return (ha_bright / 255 * 100) if ha_bright is not None else 0.0
 
 
-def resolve_brightness(hass: HomeAssistant, entity_id: str):
+def resolve_brightness(hass: HomeAssistant, entity_id: str, now: float | None = None, state=None):
     # During a dimming transition, the Hue API (and therefore HA's entity state) reports
     # brightness as though the transition happened instantaneously. If a transition stops
     # mid-flight, it takes ~10s to correct its reporting.
     #
     # The resolver decides whether to trust the reported brightness or predict its own, to
     # ensure dim-stop-dim sequences work smoothly. Expired cache entries are pruned inline.
+    # Callers that go on to write a cache entry pass `now` so both use the same clock reading.
 
-    reported = _get_ha_brightness(hass, entity_id)
+    # No transition in flight (the common case) — the reported brightness is all we need
     cached = _brightness_cache.get(entity_id)
     if not cached:
-        return reported
+        return _get_ha_brightness(hass, entity_id, state)
 
-    now = time.time()
-    elapsed = now - cached["time"]
-
-    # Dynamic guard window: sweep duration + API settle buffer for active transitions,
-    # just the settle buffer for stopped entries.
-    guard_seconds = cached["sweep"] + API_SETTLE_SECONDS if cached["dir"] != DIR_NONE else API_SETTLE_SECONDS
+    if now is None:
+        now = time.monotonic()
+    elapsed = now - cached.mtime
 
     # Guard expired — trust the reported brightness and prune the cache entry
-    if elapsed > guard_seconds:
+    if elapsed > _guard_seconds(cached):
         _brightness_cache.pop(entity_id, None)
-        return reported
+        return _get_ha_brightness(hass, entity_id, state)
 
-    # Guard active — predict brightness instead of trusting the report.
+    # Guard active — predict brightness instead of trusting the report. The report is only
+    # needed for debug logging, so skip reading it when that's off.
+    debug = _LOGGER.isEnabledFor(logging.DEBUG)
 
     # Stopped: return the cached brightness from when we stopped
-    if cached["dir"] == DIR_NONE:
-        _LOGGER.debug(
-            "CACHE [%s]: Guard active (Stationary). Ignoring reported %.1f%%. Staying at %.1f%%",
-            entity_id,
-            reported,
-            cached["bright"],
-        )
-        return cached["bright"]
+    if cached.dir == DIR_NONE:
+        if debug:
+            _LOGGER.debug(
+                "CACHE [%s]: Guard active (Stationary). Ignoring reported %.1f%%. Staying at %.1f%%",
+                entity_id,
+                _get_ha_brightness(hass, entity_id, state),
+                cached.bright,
+            )
+        return cached.bright
 
     # Moving: extrapolate brightness based on elapsed time
-    safe_sweep = max(cached["sweep"], 0.1)
+    safe_sweep = max(cached.sweep, 0.1)
     change = (100.0 / safe_sweep) * elapsed
 
-    if cached["dir"] == DIR_UP:
-        predicted = min(cached["bright"] + change, cached["target"])
-    else:
-        predicted = max(cached["bright"] - change, cached["target"])
+    # Move toward the target without overshooting it. Mirroring both sides by the sign turns
+    # max() for lowering into min(), so one expression covers both directions.
+    sign = cached.sign
+    predicted = sign * min(sign * cached.bright + change, sign * cached.target)
 
-    _LOGGER.debug(
-        "CACHE [%s]: Guard active (Moving). Ignoring reported: %.1f%%, Predicted: %.1f%%",
-        entity_id,
-        reported,
-        predicted,
-    )
+    if debug:
+        _LOGGER.debug(
+            "CACHE [%s]: Guard active (Moving). Ignoring reported: %.1f%%, Predicted: %.1f%%",
+            entity_id,
+            _get_ha_brightness(hass, entity_id, state),
+            predicted,
+        )
 
     return predicted
 
 
-async def _start_transition(hass, bridge, resource_type, resource_id, entity_id, direction, sweep, limit):
-    current_bright = resolve_brightness(hass, entity_id)
-    distance = abs(limit - current_bright)
-    dur_ms = int(distance * sweep * 10)  # 1000ms / 100% = 10ms/%
+def _light_entity_ids(entity_ids):
+    return [entity_id for entity_id in entity_ids if entity_id.startswith("light.")]
+
+
+async def _gather_entities(entity_ids, handler):
+    # Run handler for every entity concurrently, so a multi-light call costs one bridge
+    # round-trip rather than one per light. A semaphore caps how many entities are in flight.
+    # Handlers let bridge command failures raise; this is the one place they're logged.
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def _bounded(entity_id):
+        async with semaphore:
+            return await handler(entity_id)
+
+    results = await asyncio.gather(*(_bounded(entity_id) for entity_id in entity_ids), return_exceptions=True)
+
+    for entity_id, res in zip(entity_ids, results, strict=True):
+        if isinstance(res, Exception):
+            _LOGGER.error("Service call failed for %s: %s", entity_id, res)
+    return [None if isinstance(res, Exception) else res for res in results]
+
+
+async def _start_transition(hass, bridge, resource_type, resource_id, entity_id, direction, sweep, limit, state=None):
+    now = time.monotonic()
+
+    # Coalesce a repeat of the command just sent (e.g. an automation triggered twice by one
+    # button event), so the bridge isn't sent duplicate PUTs in quick succession.
+    cached = _brightness_cache.get(entity_id)
+    if (
+        cached
+        and now - cached.mtime < TRANSITION_DEBOUNCE_SECONDS
+        and (cached.dir, cached.target, cached.sweep) == (direction, limit, sweep)
+    ):
+        _LOGGER.debug("CALC [%s]: Duplicate transition within debounce window, skipped", entity_id)
+        return
+
+    current_bright = resolve_brightness(hass, entity_id, now, state)
+    # Distance in whole tenths of a percent, truncated like the float comparison it replaces.
+    # The epsilon keeps a distance of exactly 0.4 (e.g. 0.39999999) from truncating to 3.
+    distance_tenths = int(abs(limit - current_bright) * 10 + 1e-9)
+    dur_ms = distance_tenths * round(sweep * 1000) // 1000  # Full sweep (1000 tenths) takes sweep_ms
 
     _LOGGER.debug("CALC [%s]: %.1f%% -> %.1f%% | Dur: %dms", entity_id, current_bright, limit, dur_ms)
 
-    if distance < 0.4:  # Min brightness step is 0.4% (1/254)
+    if distance_tenths < 4:  # Min brightness step is 0.4% (1/254)
         return
 
-    _brightness_cache[entity_id] = {
-        "time": time.time(),
-        "bright": current_bright,
-        "target": limit,
-        "dir": direction,
-        "sweep": sweep,
-    }
+    sign = 1.0 if direction == DIR_UP else -1.0
+    _last_payload.pop(resource_id, None)  # A repeat set_attributes must not be deduped past this
+    previous = _brightness_cache.get(entity_id)
+    entry = CacheEntry(now, current_bright, limit, direction, sweep, sign)
+    _cache_brightness(entity_id, entry)
 
     controller = _get_controller(bridge, resource_type)
     on = True if direction == DIR_UP else (False if direction == DIR_DOWN and limit == 0.0 else None)
 
     try:
         await controller.set_state(resource_id, on=on, brightness=limit, transition_time=dur_ms)
-    except Exception as exc:
-        _LOGGER.debug("Transition command ignored for %s: %s", resource_id, exc)
-
-
-async def _handle_transition(hass: HomeAssistant, call: ServiceCall, direction: str, default_limit: float):
+    except Exception:
+        # The transition never started: put back the previous entry so a retry isn't debounced,
+        # unless a stop or newer transition has replaced ours while the PUT was in flight.
+        if _brightness_cache.get(entity_id) is entry:
+            if previous:
+                _brightness_cache[entity_id] = previous
+            else:
+                del _brightness_cache[entity_id]
+        raise
+
+
+async def _handle_transition(hass: HomeAssistant, call: ServiceCall, direction: int, default_limit: float):
     sweep = float(call.data.get("sweep_time", DEFAULT_SWEEP_TIME))
     sweep = max(sweep, 0.1)  # Restricts user-supplied value to +ve numbers
     limit = float(call.data.get("limit", default_limit))
 
-    entity_ids = await async_extract_entity_ids(call)
-    for entity_id in entity_ids:
-        if not entity_id.startswith("light."):
-            continue
-        bridge, resource_type, resource_id = resolve_entity(hass, entity_id)
+    async def _do(entity_id):
+        state = hass.states.get(entity_id)
+        bridge, resource_type, resource_id = resolve_entity(hass, entity_id, ent_reg, state)
         if bridge and resource_id:
-            await _start_transition(hass, bridge, resource_type, resource_id, entity_id, direction, sweep, limit)
+            await _start_transition(
+                hass, bridge, resource_type, resource_id, entity_id, direction, sweep, limit, state
+            )
+
+    ent_reg = er.async_get(hass)
+    entity_ids = _light_entity_ids(await async_extract_entity_ids(call))
+    await _gather_entities(entity_ids, _do)
 
 
 async def _handle_stop(hass: HomeAssistant, call: ServiceCall):
-    entity_ids = await async_extract_entity_ids(call)
-    for entity_id in entity_ids:
-        if not entity_id.startswith("light."):
-            continue
-        bridge, resource_type, resource_id = resolve_entity(hass, entity_id)
+    async def _do(entity_id):
+        bridge, resource_type, resource_id = resolve_entity(hass, entity_id, ent_reg)
         if not bridge or not resource_id:
-            continue
+            return
 
+        # A failed stop raises out of here, skipping the cache write
         controller = _get_controller(bridge, resource_type)
-        try:
-            await controller.set_dimming_delta(resource_id)
-        except Exception as exc:
-            _LOGGER.debug("Stop command ignored for %s: %s", resource_id, exc)
-            continue
-
-        current_bright = resolve_brightness(hass, entity_id)
-        _brightness_cache[entity_id] = {
-            "time": time.time(),
-            "bright": current_bright,
-            "target": current_bright,
-            "dir": DIR_NONE,
-            "sweep": 1.0,
-        }
+        _last_payload.pop(resource_id, None)
+        await controller.set_dimming_delta(resource_id)
+
+        now = time.monotonic()
+        current_bright = resolve_brightness(hass, entity_id, now)
+        _cache_brightness(entity_id, CacheEntry(now, current_bright, current_bright, DIR_NONE, 1.0))
 
         _LOGGER.debug("STOP [%s]: Halted at %.1f%%", entity_id, current_bright)
 
+    ent_reg = er.async_get(hass)
+    entity_ids = _light_entity_ids(await async_extract_entity_ids(call))
+    await _gather_entities(entity_ids, _do)
 
-def _resolve_group_light_ids(bridge, grouped_light_id):
-    # Resolve a grouped_light to its member light resource IDs via aiohue cache.
-    return [light.id for light in bridge.api.groups.grouped_light.get_lights(grouped_light_id)]
+
+# Mirek and kelvin are reciprocals (scaled by 10^6). Hue lights span a few hundred mirek
+# values, so memoizing the conversions keeps group aggregation to dict lookups.
+@lru_cache(maxsize=512)
+def _mirek_to_kelvin(mirek):
+    return round(1_000_000 / mirek)
+
+
+@lru_cache(maxsize=512)
+def _kelvin_to_mirek(kelvin):
+    return round(1_000_000 / kelvin)
 
 
 def _get_cached_brightness(bridge, resource_type, resource_id):
@@ -230,7 +363,7 @@ def _get_cached_light_attributes(bridge, light_id):
         return 0.0, None, None
     brightness = model.dimming.brightness if model.dimming else 0.0
     mirek = model.color_temperature.mirek if model.color_temperature else None
-    color_temp_kelvin = round(1_000_000 / mirek) if mirek else None
+    color_temp_kelvin = _mirek_to_kelvin(mirek) if mirek else None
     color_xy = (round(model.color.xy.x, 4), round(model.color.xy.y, 4)) if model.color else None
     return brightness, color_temp_kelvin, color_xy
 
@@ -242,23 +375,27 @@ def _get_cached_group_attributes(bridge, grouped_light_id):
     if not lights:
         return 0.0, None, None
 
-    brightnesses, mireks, xs, ys = [], [], [], []
+    # Running totals in one pass, rather than building a list per attribute
+    sum_b, n_b, sum_m, n_m, sum_x, sum_y, n_xy = 0.0, 0, 0, 0, 0.0, 0.0, 0
     for light in lights:
         if light.dimming:
-            brightnesses.append(light.dimming.brightness)
+            sum_b += light.dimming.brightness
+            n_b += 1
         if light.color_temperature and light.color_temperature.mirek:
-            mireks.append(light.color_temperature.mirek)
+            sum_m += light.color_temperature.mirek
+            n_m += 1
         if light.color:
-            xs.append(light.color.xy.x)
-            ys.append(light.color.xy.y)
+            sum_x += light.color.xy.x
+            sum_y += light.color.xy.y
+            n_xy += 1
 
-    avg_brightness = sum(brightnesses) / len(brightnesses) if brightnesses else 0.0
-    avg_ct_kelvin = round(1_000_000 / round(sum(mireks) / len(mireks))) if mireks else None
-    color_xy = (round(sum(xs) / len(xs), 4), round(sum(ys) / len(ys), 4)) if xs else None
+    avg_brightness = sum_b / n_b if n_b else 0.0
+    avg_ct_kelvin = _mirek_to_kelvin(round(sum_m / n_m)) if n_m else None
+    color_xy = (round(sum_x / n_xy, 4), round(sum_y / n_xy, 4)) if n_xy else None
     return avg_brightness, avg_ct_kelvin, color_xy
 
 
-def _resolve_color_xy(hass, entity_id, xy_color, hs_color, rgb_color):
+def _resolve_color_xy(hass, entity_id, xy_color, hs_color, rgb_color, state=None):
     # Convert whichever color format was provided to an XY tuple.
     # Priority: rgb_color > hs_color > xy_color. Warns if more than one is set.
     provided = [f for f in [rgb_color, hs_color, xy_color] if f is not None]
@@ -270,7 +407,8 @@ def _resolve_color_xy(hass, entity_id, xy_color, hs_color, rgb_color):
             entity_id,
         )
 
-    state = hass.states.get(entity_id)
+    if state is None:
+        state = hass.states.get(entity_id)
     supported_modes = state.attributes.get("supported_color_modes", []) if state else []
     if "xy" not in supported_modes:
         _LOGGER.warning("Entity %s does not support XY color. Skipping color.", entity_id)
@@ -283,44 +421,107 @@ def _resolve_color_xy(hass, entity_id, xy_color, hs_color, rgb_color):
     return (float(xy_color[0]), float(xy_color[1]))
 
 
-def _resolve_color_temp(hass, entity_id, color_temp_kelvin):
+def _ct_caps(attributes):
+    # (supports CT, min kelvin, max kelvin) from an entity's state attributes.
+    return (
+        "color_temp" in attributes.get("supported_color_modes", []),
+        attributes.get("min_color_temp_kelvin", 2000),
+        attributes.get("max_color_temp_kelvin", 6535),
+    )
+
+
+@callback
+def _handle_ct_entity_state_changed(event: Event):
+    # Most state changes are brightness-only; drop cached CT caps only if they changed
+    new_state = event.data.get("new_state")
+    entity_id = event.data["entity_id"]
+    if not new_state or _ct_caps(new_state.attributes) != _ct_caps_cache.get(entity_id):
+        _drop_ct_caps(entity_id)
+
+
+def _drop_ct_caps(entity_id):
+    _ct_caps_cache.pop(entity_id, None)
+    if unsub := _ct_caps_unsub.pop(entity_id, None):
+        unsub()
+
+
+def _resolve_color_temp(hass, entity_id, color_temp_kelvin, state=None):
     # Validate CT support, clamp to entity range, and convert to mirek.
-    state = hass.states.get(entity_id)
-    supported_modes = state.attributes.get("supported_color_modes", []) if state else []
+    # CT capabilities are hardware metadata, so they're read from the state once per entity
+    # and kept current by a state listener on just that entity.
+    caps = _ct_caps_cache.get(entity_id)
+    if caps is None:
+        if state is None:
+            state = hass.states.get(entity_id)
+        caps = _ct_caps(state.attributes if state else {})
+        if state:
+            _ct_caps_cache[entity_id] = caps
+            _ct_caps_unsub[entity_id] = async_track_state_change_event(
+                hass, entity_id, _handle_ct_entity_state_changed
+            )
+    supports_ct, min_k, max_k = caps
 
-    if "color_temp" not in supported_modes:
+    if not supports_ct:
         _LOGGER.warning(
             "Entity %s does not support color temperature. Skipping CT.",
             entity_id,
         )
         return None
 
-    min_k = state.attributes.get("min_color_temp_kelvin", 2000)
-    max_k = state.attributes.get("max_color_temp_kelvin", 6535)
     clamped_k = max(min_k, min(max_k, color_temp_kelvin))
-    return round(1_000_000 / clamped_k)
+    return _kelvin_to_mirek(clamped_k)
 
 
 async def _send_set_attributes(bridge, resource_type, resource_id, brightness, color_temp_mirek, color_xy):
-    # For groups, send to each individual light so attributes apply even when off.
+    brightness = float(brightness) if brightness is not None else None
+    # Only send the attributes actually being set; nothing to set means nothing to send.
+    kwargs = {
+        k: v
+        for k, v in (("brightness", brightness), ("color_temp", color_temp_mirek), ("color_xy", color_xy))
+        if v is not None
+    }
+    if not kwargs:
+        return
+
+    # Drop an exact repeat of the payload just sent to this resource (e.g. duplicate automation
+    # triggers), sparing the bridge and Zigbee network a redundant command.
+    now = time.monotonic()
+    payload = (brightness, color_temp_mirek, color_xy)
+    last = _last_payload.get(resource_id)
+    if last and last[1] == payload and now - last[0] < SET_ATTRIBUTES_DEDUPE_SECONDS:
+        _LOGGER.debug("set_attributes: identical payload for %s within dedupe window, skipped", resource_id)
+        return
+    _last_payload[resource_id] = (now, payload)
+
     if resource_type == "grouped_light":
-        light_ids = _resolve_group_light_ids(bridge, resource_id)
-        if not light_ids:
+        lights = bridge.api.groups.grouped_light.get_lights(resource_id)
+        if not lights:
             _LOGGER.warning("No lights found in group %s", resource_id)
             return
+
+        # When every light in the group is on, a single grouped_light command does the job.
+        # If the bridge rejects it (firmware without grouped_light support, or the cached on
+        # states are stale), fall through to the per-light commands below.
+        if all(light.on.on for light in lights):
+            try:
+                await bridge.api.groups.grouped_light.set_state(resource_id, **kwargs)
+                return
+            except Exception as exc:
+                _LOGGER.debug("grouped_light command failed for %s, sending per light: %s", resource_id, exc)
+
+        # Otherwise send to each individual light so attributes apply even when off.
+        light_ids = [light.id for light in lights]
     else:
         light_ids = [resource_id]
 
-    for light_id in light_ids:
-        try:
-            await bridge.api.lights.set_state(
-                light_id,
-                brightness=float(brightness) if brightness is not None else None,
-                color_temp=color_temp_mirek,
-                color_xy=color_xy,
-            )
-        except Exception as exc:
-            _LOGGER.error("set_attributes failed for light %s: %s", light_id, exc)
+    results = await asyncio.gather(
+        *(bridge.api.lights.set_state(light_id, **kwargs) for light_id in light_ids),
+        return_exceptions=True,
+    )
+    for light_id, res in zip(light_ids, results, strict=True):
+        if isinstance(res, Exception):
+            _last_payload.pop(resource_id, None)  # Let a retry through
+            _LOGGER.error("set_attributes failed for light %s: %s", light_id, res)
 
 
 def _clamp_brightness(current, min_brightness, max_brightness):
@@ -357,18 +558,25 @@ async def _handle_set_attributes(hass: HomeAssistant, call: ServiceCall):
         _LOGGER.warning("set_attributes called with no attributes to set.")
         return
 
-    entity_ids = await async_extract_entity_ids(call)
-    for entity_id in entity_ids:
-        if not entity_id.startswith("light."):
-            continue
-        bridge, resource_type, resource_id = resolve_entity(hass, entity_id)
+    needs_clamp = not has_explicit and has_clamp
+    clamp_only = needs_clamp and not has_ct and not has_color
+
+    async def _do(entity_id):
+        state = hass.states.get(entity_id)
+
+        # A clamp-only call on a light already in range is a no-op. Settle that from HA state
+        # before resolving the bridge; only a light reporting 0% needs the aiohue fallback.
+        current = resolve_brightness(hass, entity_id, state=state) if needs_clamp else None
+        if clamp_only and current >= 0.1 and _clamp_brightness(current, min_brightness, max_brightness) is None:
+            return
+
+        bridge, resource_type, resource_id = resolve_entity(hass, entity_id, ent_reg, state)
         if not bridge or not resource_id:
-            continue
+            return
 
         # Resolve brightness per-entity (explicit value, or clamped from current)
         entity_brightness = brightness
-        if not has_explicit and has_clamp:
-            current = resolve_brightness(hass, entity_id)
+        if needs_clamp:
             if current < 0.1:
                 if resource_type == "grouped_light":
                     current, _, _ = _get_cached_group_attributes(bridge, resource_id)
@@ -376,33 +584,32 @@ async def _handle_set_attributes(hass: HomeAssistant, call: ServiceCall):
                     current = _get_cached_brightness(bridge, resource_type, resource_id)
             entity_brightness = _clamp_brightness(current, min_brightness, max_brightness)
 
-        color_temp_mirek = _resolve_color_temp(hass, entity_id, color_temp_kelvin) if has_ct else None
-        color_xy = _resolve_color_xy(hass, entity_id, xy_color, hs_color, rgb_color) if has_color else None
-        if entity_brightness is not None or color_temp_mirek is not None or color_xy is not None:
-            await _send_set_attributes(
-                bridge, resource_type, resource_id, entity_brightness, color_temp_mirek, color_xy
-            )
+        color_temp_mirek = _resolve_color_temp(hass, entity_id, color_temp_kelvin, state) if has_ct else None
+        color_xy = _resolve_color_xy(hass, entity_id, xy_color, hs_color, rgb_color, state) if has_color else None
+        await _send_set_attributes(bridge, resource_type, resource_id, entity_brightness, color_temp_mirek, color_xy)
+
+    ent_reg = er.async_get(hass)
+    entity_ids = _light_entity_ids(await async_extract_entity_ids(call))
+    await _gather_entities(entity_ids, _do)
 
 
 async def _handle_get_attributes(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
-    result = {}
-    entity_ids = await async_extract_entity_ids(call)
-    for entity_id in entity_ids:
-        if not entity_id.startswith("light."):
-            continue
-        bridge, resource_type, resource_id = resolve_entity(hass, entity_id)
+    async def _do(entity_id):
+        state = hass.states.get(entity_id)
+        bridge, resource_type, resource_id = resolve_entity(hass, entity_id, ent_reg, state)
         if not bridge or not resource_id:
-            continue
+            return None
 
         if resource_type == "grouped_light":
             brightness, color_temp_kelvin, color_xy = _get_cached_group_attributes(bridge, resource_id)
         else:
+            # CT and color: always from aiohue cache (HA doesn't retain these when off).
+            # The same model read supplies the brightness fallback.
+            cached_brightness, color_temp_kelvin, color_xy = _get_cached_light_attributes(bridge, resource_id)
             # Brightness: cache/HA first, aiohue cache fallback
-            brightness = resolve_brightness(hass, entity_id)
+            brightness = resolve_brightness(hass, entity_id, state=state)
             if brightness < 0.1:
-                brightness = _get_cached_brightness(bridge, resource_type, resource_id)
-            # CT and color: always from aiohue cache (HA doesn't retain these when off)
-            _, color_temp_kelvin, color_xy = _get_cached_light_attributes(bridge, resource_id)
+                brightness = cached_brightness
 
         if color_xy:
             hs = color_xy_to_hs(*color_xy)
@@ -417,9 +624,40 @@ async def _handle_get_attributes(hass: HomeAssistant, call: ServiceCall) -> Serv
             attrs["color_xy"] = list(color_xy)
             attrs["rgb_color"] = list(rgb)
             attrs["hs_color"] = list(hs)
-        result[entity_id] = attrs
+        return entity_id, attrs
+
+    ent_reg = er.async_get(hass)
+    entity_ids = _light_entity_ids(await async_extract_entity_ids(call))
+    results = await _gather_entities(entity_ids, _do)
+    return dict(r for r in results if r)
 
-    return result
+
+@callback
+def _handle_entity_registry_updated(event: Event):
+    # Drop everything cached for a removed or updated entity (under its old ID too, if renamed).
+    # Other entities keep their hot cache entries.
+    if event.data["action"] == "create":
+        return
+    for entity_id in (event.data["entity_id"], event.data.get("old_entity_id")):
+        _entity_resolve_cache.pop(entity_id, None)
+        _brightness_cache.pop(entity_id, None)
+        _drop_ct_caps(entity_id)
+
+
+@callback
+def _handle_prune_interval(_now):
+    now = time.monotonic()
+    _prune_brightness_cache(now)
+    _prune_last_payload(now)
+
+
+@callback
+def _async_track_cache_invalidation(hass: HomeAssistant, entry: ConfigEntry):
+    # Keep module-level caches in step with the entity registry while loaded.
+    entry.async_on_unload(hass.bus.async_listen(er.EVENT_ENTITY_REGISTRY_UPDATED, _handle_entity_registry_updated))
+    entry.async_on_unload(
+        async_track_time_interval(hass, _handle_prune_interval, timedelta(seconds=BRIGHTNESS_CACHE_PRUNE_SECONDS))
+    )
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
@@ -440,6 +678,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     async def handle_get_attributes(call: ServiceCall) -> ServiceResponse:
         return await _handle_get_attributes(hass, call)
 
+    _async_track_cache_invalidation(hass, entry)
+
     hass.services.async_register(DOMAIN, SERVICE_RAISE, handle_raise)
     hass.services.async_register(DOMAIN, SERVICE_LOWER, handle_lower)
     hass.services.async_register(DOMAIN, SERVICE_STOP, handle_stop)
@@ -454,4 +694,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     for svc in [SERVICE_RAISE, SERVICE_LOWER, SERVICE_STOP, SERVICE_SET_ATTRIBUTES, SERVICE_GET_ATTRIBUTES]:
         hass.services.async_remove(DOMAIN, svc)
+    _entity_resolve_cache.clear()
+    for entity_id in list(_ct_caps_cache):
+        _drop_ct_caps(entity_id)
+    _last_payload.clear()
     return True
@@ -12,6 +12,19 @@ DEFAULT_MIN_BRIGHTNESS = 0.0
 
 API_SETTLE_SECONDS = 15
 
-DIR_UP = "up"
-DIR_DOWN = "down"
-DIR_NONE = "none"
+# Identical raise/lower commands for a light within this window are sent only once
+TRANSITION_DEBOUNCE_SECONDS = 0.04
+
+# Identical set_attributes payloads for a light or group within this window are sent only once
+SET_ATTRIBUTES_DEDUPE_SECONDS = 0.1
+
+BRIGHTNESS_CACHE_MAX_ENTRIES = 256
+BRIGHTNESS_CACHE_PRUNE_SECONDS = 60
+
+# Max entities a single service call handles at once. Each entity is one bridge request,
+# except a partly-off group, which sends one request per member light.
+MAX_CONCURRENT_REQUESTS = 8
+
+DIR_UP = 1
+DIR_DOWN = 2
+DIR_NONE = 0
@@ -1,20 +1,70 @@
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.hue_dimmer import (
+    _brightness_cache,
+    _ct_caps_cache,
+    _ct_caps_unsub,
+    _entity_resolve_cache,
+    _last_payload,
+)
+
+RESOURCE_ID = "abc-123"
+ENTITY_ID = "light.kitchen"
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # The integration keeps its caches at module level, so reset them around every test
+    caches = (_brightness_cache, _ct_caps_cache, _ct_caps_unsub, _entity_resolve_cache, _last_payload)
+    for cache in caches:
+        cache.clear()
+    yield
+    for cache in caches:
+        cache.clear()
 
 
 @pytest.fixture
 def mock_bridge():
-    bridge = MagicMock()
-    bridge.api.lights.set_state = AsyncMock()
-    bridge.api.groups.grouped_light.set_state = AsyncMock()
-    bridge.api.groups.grouped_light.get_lights.return_value = []
+    # Spec each level with the attributes the integration uses, so mocks aren't created
+    # lazily on attribute access and a misspelled call fails instead of passing silently.
+    lights = MagicMock(spec=["get", "set_state"])
+    lights.set_state = AsyncMock()
+    grouped_light = MagicMock(spec=["get", "get_lights", "set_state"])
+    grouped_light.set_state = AsyncMock()
+    grouped_light.get_lights = MagicMock(return_value=[])
+
+    bridge = MagicMock(spec=["api"])
+    bridge.api = MagicMock(spec=["lights", "groups"])
+    bridge.api.lights = lights
+    bridge.api.groups = MagicMock(spec=["grouped_light"])
+    bridge.api.groups.grouped_light = grouped_light
     return bridge
 
 
+class _StatesStub:
+    # Stands in for hass.states: get() returns whatever state the test assigned.
+    def __init__(self):
+        self.state = None
+
+    def get(self, entity_id):
+        return self.state
+
+
+class _HassStub:
+    # Minimal HomeAssistant: a state machine stub, an event bus for listeners to register on,
+    # and an (unused) entity registry slot.
+    def __init__(self):
+        self.states = _StatesStub()
+        self.bus = MagicMock()
+        self.data = {er.DATA_REGISTRY: MagicMock()}
+
+
 @pytest.fixture
 def mock_hass():
-    return MagicMock()
+    return _HassStub()
 
 
 def make_service_call(data):
@@ -34,3 +84,10 @@ def make_entity_state(supported_color_modes=None, min_color_temp_kelvin=None, ma
         attrs["max_color_temp_kelvin"] = max_color_temp_kelvin
     state.attributes = attrs
     return state
+
+
+def make_light(light_id, on=False):
+    light = MagicMock()
+    light.id = light_id
+    light.on.on = on
+    return light
@@ -0,0 +1,43 @@
+from custom_components.hue_dimmer import (
+    CacheEntry,
+    _brightness_cache,
+    _cache_brightness,
+    _prune_brightness_cache,
+)
+from custom_components.hue_dimmer.const import API_SETTLE_SECONDS, BRIGHTNESS_CACHE_MAX_ENTRIES, DIR_NONE, DIR_UP
+
+
+def _stopped(mtime):
+    return CacheEntry(mtime, 50.0, 50.0, DIR_NONE, 1.0)
+
+
+def test_oldest_entry_evicted_when_full():
+    for i in range(BRIGHTNESS_CACHE_MAX_ENTRIES + 1):
+        _cache_brightness(f"light.bulb_{i}", _stopped(0.0))
+
+    assert len(_brightness_cache) == BRIGHTNESS_CACHE_MAX_ENTRIES
+    assert "light.bulb_0" not in _brightness_cache
+    assert f"light.bulb_{BRIGHTNESS_CACHE_MAX_ENTRIES}" in _brightness_cache
+
+
+def test_rewritten_entry_not_evicted():
+    for i in range(BRIGHTNESS_CACHE_MAX_ENTRIES):
+        _cache_brightness(f"light.bulb_{i}", _stopped(0.0))
+
+    # Writing again makes bulb_0 the most recent, so bulb_1 goes instead
+    _cache_brightness("light.bulb_0", _stopped(1.0))
+    _cache_brightness("light.new", _stopped(1.0))
+
+    assert "light.bulb_0" in _brightness_cache
+    assert "light.bulb_1" not in _brightness_cache
+
+
+def test_prune_drops_only_expired_entries():
+    _cache_brightness("light.stopped", _stopped(0.0))
+    # Moving entries are guarded for the sweep on top of the settle buffer
+    _cache_brightness("light.moving", CacheEntry(0.0, 0.0, 100.0, DIR_UP, 5.0, 1.0))
+    _cache_brightness("light.recent", _stopped(10.0))
+
+    _prune_brightness_cache(API_SETTLE_SECONDS + 1.0)
+
+    assert list(_brightness_cache) == ["light.moving", "light.recent"]
@@ -0,0 +1,92 @@
+from unittest.mock import MagicMock
+
+import pytest
+from homeassistant.core import Event
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.hue_dimmer import (
+    CacheEntry,
+    _brightness_cache,
+    _ct_caps_cache,
+    _ct_caps_unsub,
+    _entity_resolve_cache,
+    _handle_ct_entity_state_changed,
+    _handle_entity_registry_updated,
+    _resolve_color_temp,
+)
+from custom_components.hue_dimmer.const import DIR_NONE
+from tests.conftest import ENTITY_ID, make_entity_state
+
+OLD_ID = ENTITY_ID
+NEW_ID = "light.kitchen_ceiling"
+OTHER_ID = "light.hallway"
+
+
+@pytest.fixture(autouse=True)
+def populate_caches():
+    for entity_id in (OLD_ID, NEW_ID, OTHER_ID):
+        _entity_resolve_cache[entity_id] = (None, "light", entity_id)
+        _brightness_cache[entity_id] = CacheEntry(0.0, 50.0, 50.0, DIR_NONE, 1.0)
+        _ct_caps_cache[entity_id] = (True, 2000, 6535)
+
+
+def _cached_ids():
+    return set(_entity_resolve_cache), set(_brightness_cache), set(_ct_caps_cache)
+
+
+@pytest.mark.parametrize(
+    ("data", "remaining"),
+    [
+        # A rename drops both the new and the old entity ID
+        pytest.param({"action": "update", "entity_id": NEW_ID, "old_entity_id": OLD_ID}, {OTHER_ID}, id="rename"),
+        pytest.param({"action": "update", "entity_id": OLD_ID, "changes": {}}, {NEW_ID, OTHER_ID}, id="update"),
+        pytest.param({"action": "remove", "entity_id": OLD_ID}, {NEW_ID, OTHER_ID}, id="remove"),
+        # Nothing can be cached for an entity that didn't exist yet
+        pytest.param({"action": "create", "entity_id": OLD_ID}, {OLD_ID, NEW_ID, OTHER_ID}, id="create"),
+    ],
+)
+def test_registry_update_invalidates_caches(data, remaining):
+    _handle_entity_registry_updated(Event(er.EVENT_ENTITY_REGISTRY_UPDATED, data))
+
+    assert _cached_ids() == (remaining, remaining, remaining)
+
+
+def _ct_state(min_kelvin, brightness):
+    state = make_entity_state(
+        supported_color_modes=["color_temp"], min_color_temp_kelvin=min_kelvin, max_color_temp_kelvin=6535
+    )
+    state.attributes["brightness"] = brightness
+    return state
+
+
+def test_ct_caps_kept_across_brightness_changes(mock_hass):
+    del _ct_caps_cache[OLD_ID]  # Start uncached, so the lookup below subscribes
+    mock_hass.states.state = _ct_state(2202, 128)
+    _resolve_color_temp(mock_hass, OLD_ID, 3000)
+    assert _ct_caps_cache[OLD_ID] == (True, 2202, 6535)
+    assert OLD_ID in _ct_caps_unsub
+
+    # A brightness-only update leaves the cached caps (and their listener) in place
+    _handle_ct_entity_state_changed(Event("state_changed", {"entity_id": OLD_ID, "new_state": _ct_state(2202, 20)}))
+    assert OLD_ID in _ct_caps_cache
+    assert OLD_ID in _ct_caps_unsub
+
+
+@pytest.mark.parametrize(
+    "new_state",
+    [
+        pytest.param(_ct_state(2700, 128), id="range_changed"),
+        pytest.param(None, id="removed"),
+    ],
+)
+def test_ct_caps_dropped_when_capabilities_change(mock_hass, new_state):
+    del _ct_caps_cache[OLD_ID]  # Start uncached, so the lookup below subscribes
+    mock_hass.states.state = _ct_state(2202, 128)
+    _resolve_color_temp(mock_hass, OLD_ID, 3000)
+    unsub = _ct_caps_unsub[OLD_ID] = MagicMock()
+
+    _handle_ct_entity_state_changed(Event("state_changed", {"entity_id": OLD_ID, "new_state": new_state}))
+
+    assert OLD_ID not in _ct_caps_cache
+    assert OLD_ID not in _ct_caps_unsub
+    unsub.assert_called_once()
@@ -0,0 +1,45 @@
+from unittest.mock import MagicMock
+
+import pytest
+from homeassistant.const import STATE_ON, STATE_UNAVAILABLE
+
+from custom_components.hue_dimmer import _entity_resolve_cache, resolve_entity
+from tests.conftest import ENTITY_ID, RESOURCE_ID
+
+
+@pytest.fixture
+def hue_setup(mock_hass):
+    # A registry entry backed by a loaded V2 Hue config entry
+    bridge = MagicMock(api_version=2)
+    config_entry = MagicMock(domain="hue", runtime_data=bridge)
+    mock_hass.config_entries = MagicMock()
+    mock_hass.config_entries.async_get_entry.return_value = config_entry
+
+    ent_reg = MagicMock()
+    ent_reg.async_get.return_value = MagicMock(config_entry_id="hue-entry", unique_id=RESOURCE_ID)
+    return mock_hass, ent_reg, bridge
+
+
+def _group_state(state, attributes):
+    group = MagicMock()
+    group.state = state
+    group.attributes = attributes
+    return group
+
+
+def test_group_resolved_while_unavailable_recovers(hue_setup):
+    hass, ent_reg, bridge = hue_setup
+
+    # is_hue_group is an extra state attribute, so it's missing while the group is unavailable
+    hass.states.state = _group_state(STATE_UNAVAILABLE, {})
+    assert resolve_entity(hass, ENTITY_ID, ent_reg) == (bridge, "light", RESOURCE_ID)
+    assert ENTITY_ID not in _entity_resolve_cache
+
+    hass.states.state = _group_state(STATE_ON, {"is_hue_group": True})
+    assert resolve_entity(hass, ENTITY_ID, ent_reg) == (bridge, "grouped_light", RESOURCE_ID)
+    assert ENTITY_ID in _entity_resolve_cache
+
+    # Served from cache from here on
+    ent_reg.async_get.reset_mock()
+    assert resolve_entity(hass, ENTITY_ID, ent_reg) == (bridge, "grouped_light", RESOURCE_ID)
+    ent_reg.async_get.assert_not_called()
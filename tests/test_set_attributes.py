@@ -1,334 +1,367 @@
-from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+from unittest.mock import MagicMock, patch
 
 import pytest
 from homeassistant.util.color import color_hs_to_xy, color_RGB_to_xy
 
-from custom_components.hue_dimmer import _handle_set_attributes
-from tests.conftest import make_entity_state, make_service_call
+from custom_components import hue_dimmer as _hd
+from custom_components.hue_dimmer import _handle_set_attributes, _last_payload, _prune_last_payload
+from tests.conftest import ENTITY_ID, RESOURCE_ID, make_entity_state, make_light, make_service_call
 
-RESOURCE_ID = "abc-123"
-ENTITY_ID = "light.kitchen"
+_ONE_ENTITY = frozenset({ENTITY_ID})
 
 
-@pytest.fixture
-def mock_bridge():
-    bridge = MagicMock()
-    bridge.api.lights.set_state = AsyncMock()
-    bridge.api.groups.grouped_light.get_lights.return_value = []
-    return bridge
+async def _extract(call):
+    entity_ids = call.data.get("entity_id")
+    return _ONE_ENTITY if entity_ids == [ENTITY_ID] else frozenset(entity_ids or ())
 
 
-@pytest.fixture
-def mock_hass():
-    return MagicMock()
-
-
-@pytest.fixture(autouse=True)
+@pytest.fixture(scope="module", autouse=True)
 def patch_extract_entity_ids():
-    async def _extract(call):
-        return set(call.data.get("entity_id", []))
-
-    with patch(
-        "custom_components.hue_dimmer.async_extract_entity_ids",
-        side_effect=_extract,
-    ):
-        yield
-
-
-def patch_bridge(bridge, resource_type="light"):
-    return patch(
-        "custom_components.hue_dimmer.resolve_entity",
-        return_value=(bridge, resource_type, RESOURCE_ID),
-    )
+    # Stateless replacement, so one patch serves every test in this module
+    patcher = patch("custom_components.hue_dimmer.async_extract_entity_ids", new=_extract)
+    patcher.start()
+    yield
+    patcher.stop()
+
+
+def set_bridge(monkeypatch, bridge, resource_type="light"):
+    resolve = MagicMock(return_value=(bridge, resource_type, RESOURCE_ID))
+    monkeypatch.setattr(_hd, "resolve_entity", resolve)
+    return resolve
+
+
+def _call(data):
+    return make_service_call({"entity_id": [ENTITY_ID], **data})
+
+
+# Shared service calls and entity states, built once. The handler only reads
+# call.data, so sharing is safe; tests must not mutate them.
+_BRIGHTNESS_50_CALL = _call({"brightness": 50})
+_BRIGHTNESS_80_CALL = _call({"brightness": 80})
+_CLAMP_CALL = _call({"min_brightness": 30, "max_brightness": 80})
+
+CT_STATE = make_entity_state(
+    supported_color_modes=["color_temp"],
+    min_color_temp_kelvin=2202,
+    max_color_temp_kelvin=6535,
+)
+BRIGHTNESS_ONLY_STATE = make_entity_state(supported_color_modes=["brightness"])
+XY_STATE = make_entity_state(supported_color_modes=["xy"])
+
+# (prebuilt service call, entity state or None, expected set_state kwargs or None if not called)
+CASES = [
+    pytest.param(
+        _call({"brightness": 42.5}),
+        None,
+        {"brightness": 42.5},
+        id="brightness_only",
+    ),
+    pytest.param(
+        _call({"color_temp_kelvin": 3000}),
+        CT_STATE,
+        {"color_temp": 333},
+        id="ct_only_on_ct_light",
+    ),
+    pytest.param(
+        _call({"brightness": 75, "color_temp_kelvin": 4000}),
+        CT_STATE,
+        {"brightness": 75.0, "color_temp": 250},
+        id="brightness_and_ct",
+    ),
+    # CT skipped, brightness still sent
+    pytest.param(
+        _call({"brightness": 50, "color_temp_kelvin": 3000}),
+        BRIGHTNESS_ONLY_STATE,
+        {"brightness": 50.0},
+        id="ct_on_non_ct_light_with_brightness",
+    ),
+    # No attributes to send — set_state should not be called
+    pytest.param(_call({"color_temp_kelvin": 3000}), BRIGHTNESS_ONLY_STATE, None, id="ct_only_on_non_ct_light"),
+    pytest.param(_call({}), None, None, id="no_fields_provided"),
+    # 1000K clamped to min 2202K → mirek = round(1_000_000 / 2202) = 454
+    pytest.param(
+        _call({"color_temp_kelvin": 1000}),
+        CT_STATE,
+        {"color_temp": 454},
+        id="ct_clamped_to_min",
+    ),
+    # 9000K clamped to max 6535K → mirek = round(1_000_000 / 6535) = 153
+    pytest.param(
+        _call({"color_temp_kelvin": 9000}),
+        CT_STATE,
+        {"color_temp": 153},
+        id="ct_clamped_to_max",
+    ),
+]
 
 
 # ---------------------------------------------------------------------------
-# Existing tests — updated to include color_xy=None
+# Existing tests
 # ---------------------------------------------------------------------------
 
-@pytest.mark.asyncio
-async def test_brightness_only(mock_hass, mock_bridge):
-    call = make_service_call({"entity_id": [ENTITY_ID], "brightness": 42.5})
 
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
+@pytest.mark.parametrize(("call", "state", "expected"), CASES)
+async def test_set_attributes(mock_hass, mock_bridge, monkeypatch, call, state, expected):
+    if state is not None:
+        mock_hass.states.state = state
 
-    mock_bridge.api.lights.set_state.assert_called_once_with(
-        RESOURCE_ID,
-        brightness=42.5,
-        color_temp=None,
-        color_xy=None,
-    )
+    set_bridge(monkeypatch, mock_bridge)
+    await _handle_set_attributes(mock_hass, call)
 
+    if expected is None:
+        mock_bridge.api.lights.set_state.assert_not_called()
+    else:
+        mock_bridge.api.lights.set_state.assert_called_once_with(RESOURCE_ID, **expected)
 
-@pytest.mark.asyncio
-async def test_ct_only_on_ct_light(mock_hass, mock_bridge):
-    call = make_service_call({"entity_id": [ENTITY_ID], "color_temp_kelvin": 3000})
-    mock_hass.states.get.return_value = make_entity_state(
-        supported_color_modes=["color_temp"],
-        min_color_temp_kelvin=2202,
-        max_color_temp_kelvin=6535,
-    )
 
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
+@pytest.mark.parametrize(
+    ("resource_type", "light_ids"),
+    [
+        pytest.param("light", [RESOURCE_ID], id="light"),
+        pytest.param("grouped_light", ["light-1", "light-2"], id="group"),
+    ],
+)
+async def test_api_error_handled(mock_hass, mock_bridge, monkeypatch, resource_type, light_ids):
+    call = _BRIGHTNESS_50_CALL
+    mock_bridge.api.groups.grouped_light.get_lights.return_value = [make_light(lid) for lid in light_ids]
 
-    mock_bridge.api.lights.set_state.assert_called_once_with(
-        RESOURCE_ID,
-        brightness=None,
-        color_temp=333,
-        color_xy=None,
-    )
+    # Only the first light fails
+    async def _set_state(light_id, **kwargs):
+        if light_id == light_ids[0]:
+            raise Exception("Connection refused")
 
+    mock_bridge.api.lights.set_state.side_effect = _set_state
 
-@pytest.mark.asyncio
-async def test_brightness_and_ct(mock_hass, mock_bridge):
-    call = make_service_call({
-        "entity_id": [ENTITY_ID],
-        "brightness": 75,
-        "color_temp_kelvin": 4000,
-    })
-    mock_hass.states.get.return_value = make_entity_state(
-        supported_color_modes=["color_temp"],
-        min_color_temp_kelvin=2202,
-        max_color_temp_kelvin=6535,
-    )
+    set_bridge(monkeypatch, mock_bridge, resource_type=resource_type)
 
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
+    # Should not raise
+    await _handle_set_attributes(mock_hass, call)
 
-    mock_bridge.api.lights.set_state.assert_called_once_with(
-        RESOURCE_ID,
-        brightness=75.0,
-        color_temp=250,
-        color_xy=None,
-    )
+    # A failed light doesn't stop the rest of the group receiving the command
+    called_ids = [c.args[0] for c in mock_bridge.api.lights.set_state.call_args_list]
+    assert sorted(called_ids) == sorted(light_ids)
 
 
-@pytest.mark.asyncio
-async def test_ct_on_non_ct_light_with_brightness(mock_hass, mock_bridge):
-    call = make_service_call({
-        "entity_id": [ENTITY_ID],
-        "brightness": 50,
-        "color_temp_kelvin": 3000,
-    })
-    mock_hass.states.get.return_value = make_entity_state(
-        supported_color_modes=["brightness"],
-    )
-
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
-
-    # CT skipped, brightness still sent
-    mock_bridge.api.lights.set_state.assert_called_once_with(
-        RESOURCE_ID,
-        brightness=50.0,
-        color_temp=None,
-        color_xy=None,
-    )
+async def test_dedupe_within_window(mock_hass, mock_bridge, monkeypatch):
+    call = _BRIGHTNESS_50_CALL
 
+    set_bridge(monkeypatch, mock_bridge)
+    await _handle_set_attributes(mock_hass, call)
+    await _handle_set_attributes(mock_hass, call)
 
-@pytest.mark.asyncio
-async def test_ct_only_on_non_ct_light(mock_hass, mock_bridge):
-    call = make_service_call({"entity_id": [ENTITY_ID], "color_temp_kelvin": 3000})
-    mock_hass.states.get.return_value = make_entity_state(
-        supported_color_modes=["brightness"],
-    )
+    # Second identical call lands inside the dedupe window — only one command sent
+    mock_bridge.api.lights.set_state.assert_called_once()
 
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
 
-    # No attributes to send — set_state should not be called
-    mock_bridge.api.lights.set_state.assert_not_called()
+def test_prune_last_payload_drops_expired_entries():
+    _last_payload["old"] = (0.0, (50.0, None, None))
+    _last_payload["recent"] = (10.0, (50.0, None, None))
 
+    _prune_last_payload(10.05)
 
-@pytest.mark.asyncio
-async def test_no_fields_provided(mock_hass, mock_bridge):
-    call = make_service_call({"entity_id": [ENTITY_ID]})
+    assert list(_last_payload) == ["recent"]
 
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
 
-    mock_bridge.api.lights.set_state.assert_not_called()
+async def test_group_resolves_to_individual_lights(mock_hass, mock_bridge, monkeypatch):
+    call = _BRIGHTNESS_80_CALL
 
+    mock_bridge.api.groups.grouped_light.get_lights.return_value = [make_light("light-1"), make_light("light-2")]
 
-@pytest.mark.asyncio
-async def test_ct_clamped_to_min(mock_hass, mock_bridge):
-    call = make_service_call({"entity_id": [ENTITY_ID], "color_temp_kelvin": 1000})
-    mock_hass.states.get.return_value = make_entity_state(
-        supported_color_modes=["color_temp"],
-        min_color_temp_kelvin=2202,
-        max_color_temp_kelvin=6535,
-    )
+    # Track how many set_state calls are awaiting the bridge at once
+    in_flight = peak = 0
 
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
+    async def _set_state(*args, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
 
-    # 1000K clamped to min 2202K → mirek = round(1_000_000 / 2202) = 454
-    mock_bridge.api.lights.set_state.assert_called_once_with(
-        RESOURCE_ID,
-        brightness=None,
-        color_temp=454,
-        color_xy=None,
-    )
+    mock_bridge.api.lights.set_state.side_effect = _set_state
 
+    set_bridge(monkeypatch, mock_bridge, resource_type="grouped_light")
+    await _handle_set_attributes(mock_hass, call)
 
-@pytest.mark.asyncio
-async def test_ct_clamped_to_max(mock_hass, mock_bridge):
-    call = make_service_call({"entity_id": [ENTITY_ID], "color_temp_kelvin": 9000})
-    mock_hass.states.get.return_value = make_entity_state(
-        supported_color_modes=["color_temp"],
-        min_color_temp_kelvin=2202,
-        max_color_temp_kelvin=6535,
-    )
-
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
-
-    # 9000K clamped to max 6535K → mirek = round(1_000_000 / 6535) = 153
-    mock_bridge.api.lights.set_state.assert_called_once_with(
-        RESOURCE_ID,
-        brightness=None,
-        color_temp=153,
-        color_xy=None,
-    )
-
+    assert mock_bridge.api.lights.set_state.await_count == 2
+    assert peak == 2  # dispatched concurrently, not one after another
+    calls = mock_bridge.api.lights.set_state.call_args_list
+    called_ids = {c.args[0] for c in calls}
+    assert called_ids == {"light-1", "light-2"}
+    for c in calls:
+        assert c.kwargs["brightness"] == 80.0
+        assert "color_temp" not in c.kwargs
+        assert "color_xy" not in c.kwargs
+
+
+@pytest.mark.parametrize(
+    ("lights_on", "grouped_supported", "grouped_calls"),
+    [
+        pytest.param((True, True), True, 1, id="all_on"),
+        pytest.param((True, False), True, 0, id="some_off"),
+        pytest.param((False, False), True, 0, id="all_off"),
+        # Bridge rejects grouped_light commands — the per-light path still delivers
+        pytest.param((True, True), False, 1, id="all_on_grouped_rejected"),
+    ],
+)
+async def test_group_batched_when_all_lights_on(
+    mock_hass, mock_bridge, monkeypatch, lights_on, grouped_supported, grouped_calls
+):
+    call = _BRIGHTNESS_80_CALL
+    mock_bridge.api.groups.grouped_light.get_lights.return_value = [
+        make_light(f"light-{i}", on=on) for i, on in enumerate(lights_on, start=1)
+    ]
+    if not grouped_supported:
+        mock_bridge.api.groups.grouped_light.set_state.side_effect = Exception("Bridge firmware too old")
+
+    set_bridge(monkeypatch, mock_bridge, resource_type="grouped_light")
+    await _handle_set_attributes(mock_hass, call)
+
+    assert mock_bridge.api.groups.grouped_light.set_state.call_count == grouped_calls
+    if grouped_calls:
+        mock_bridge.api.groups.grouped_light.set_state.assert_called_once_with(RESOURCE_ID, brightness=80.0)
+
+    if grouped_calls and grouped_supported:
+        # All lights on — one grouped_light command instead of one per light
+        mock_bridge.api.lights.set_state.assert_not_called()
+    else:
+        # Some lights off, or grouped command rejected — per-light commands so every light gets it
+        assert mock_bridge.api.lights.set_state.call_count == len(lights_on)
+
+
+async def test_group_falls_back_to_lights_when_grouped_call_fails(mock_hass, mock_bridge, monkeypatch, caplog):
+    call = _BRIGHTNESS_80_CALL
+    mock_bridge.api.groups.grouped_light.get_lights.return_value = [
+        make_light("light-1", on=True),
+        make_light("light-2", on=True),
+    ]
+    # e.g. bridge firmware older than aiohue's grouped_light minimum
+    mock_bridge.api.groups.grouped_light.set_state.side_effect = Exception("Bridge firmware too old")
+
+    set_bridge(monkeypatch, mock_bridge, resource_type="grouped_light")
+    await _handle_set_attributes(mock_hass, call)
+
+    mock_bridge.api.groups.grouped_light.set_state.assert_awaited_once()
+    calls = mock_bridge.api.lights.set_state.call_args_list
+    assert {c.args[0] for c in calls} == {"light-1", "light-2"}
+    assert all(c.kwargs == {"brightness": 80.0} for c in calls)
+    # A fallback that delivered everything isn't an error
+    assert "ERROR" not in {r.levelname for r in caplog.records}
 
-@pytest.mark.asyncio
-async def test_api_error_handled(mock_hass, mock_bridge):
-    call = make_service_call({"entity_id": [ENTITY_ID], "brightness": 50})
-    mock_bridge.api.lights.set_state.side_effect = Exception("Connection refused")
 
-    with patch_bridge(mock_bridge):
-        # Should not raise
-        await _handle_set_attributes(mock_hass, call)
+async def test_group_no_lights_found(mock_hass, mock_bridge, monkeypatch):
+    call = _BRIGHTNESS_50_CALL
+    mock_bridge.api.groups.grouped_light.get_lights.return_value = []
 
-    mock_bridge.api.lights.set_state.assert_called_once()
+    set_bridge(monkeypatch, mock_bridge, resource_type="grouped_light")
+    await _handle_set_attributes(mock_hass, call)
 
+    mock_bridge.api.lights.set_state.assert_not_called()
 
-@pytest.mark.asyncio
-async def test_group_resolves_to_individual_lights(mock_hass, mock_bridge):
-    call = make_service_call({"entity_id": [ENTITY_ID], "brightness": 80})
 
-    light1 = MagicMock()
-    light1.id = "light-1"
-    light2 = MagicMock()
-    light2.id = "light-2"
-    mock_bridge.api.groups.grouped_light.get_lights.return_value = [light1, light2]
+async def test_clamp_in_range_skips_bridge_lookup(mock_hass, mock_bridge, monkeypatch):
+    call = _CLAMP_CALL
+    state = make_entity_state()
+    state.attributes["brightness"] = 128  # ~50%
+    mock_hass.states.state = state
 
-    with patch_bridge(mock_bridge, resource_type="grouped_light"):
-        await _handle_set_attributes(mock_hass, call)
+    resolve = set_bridge(monkeypatch, mock_bridge)
+    await _handle_set_attributes(mock_hass, call)
 
-    assert mock_bridge.api.lights.set_state.call_count == 2
-    calls = mock_bridge.api.lights.set_state.call_args_list
-    called_ids = {c.args[0] for c in calls}
-    assert called_ids == {"light-1", "light-2"}
-    for c in calls:
-        assert c.kwargs["brightness"] == 80.0
-        assert c.kwargs["color_temp"] is None
-        assert c.kwargs["color_xy"] is None
+    resolve.assert_not_called()
+    mock_bridge.api.lights.set_state.assert_not_called()
 
 
-@pytest.mark.asyncio
-async def test_group_no_lights_found(mock_hass, mock_bridge):
-    call = make_service_call({"entity_id": [ENTITY_ID], "brightness": 50})
-    mock_bridge.api.groups.grouped_light.get_lights.return_value = []
+async def test_clamp_out_of_range(mock_hass, mock_bridge, monkeypatch):
+    call = _CLAMP_CALL
+    state = make_entity_state()
+    state.attributes["brightness"] = 255
+    mock_hass.states.state = state
 
-    with patch_bridge(mock_bridge, resource_type="grouped_light"):
-        await _handle_set_attributes(mock_hass, call)
+    set_bridge(monkeypatch, mock_bridge)
+    await _handle_set_attributes(mock_hass, call)
 
-    mock_bridge.api.lights.set_state.assert_not_called()
+    mock_bridge.api.lights.set_state.assert_called_once_with(
+        RESOURCE_ID,
+        brightness=80.0,
+    )
 
 
 # ---------------------------------------------------------------------------
 # New tests — color input (xy_color, hs_color, rgb_color)
 # ---------------------------------------------------------------------------
 
-@pytest.mark.asyncio
-async def test_xy_color_on_color_light(mock_hass, mock_bridge):
+async def test_xy_color_on_color_light(mock_hass, mock_bridge, monkeypatch):
     call = make_service_call({"entity_id": [ENTITY_ID], "xy_color": [0.369, 0.445]})
-    mock_hass.states.get.return_value = make_entity_state(supported_color_modes=["xy"])
+    mock_hass.states.state = XY_STATE
 
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
+    set_bridge(monkeypatch, mock_bridge)
+    await _handle_set_attributes(mock_hass, call)
 
     mock_bridge.api.lights.set_state.assert_called_once_with(
         RESOURCE_ID,
-        brightness=None,
-        color_temp=None,
         color_xy=(0.369, 0.445),
     )
 
 
-@pytest.mark.asyncio
-async def test_hs_color_on_color_light(mock_hass, mock_bridge):
+async def test_hs_color_on_color_light(mock_hass, mock_bridge, monkeypatch):
     call = make_service_call({"entity_id": [ENTITY_ID], "hs_color": [30, 80]})
-    mock_hass.states.get.return_value = make_entity_state(supported_color_modes=["xy"])
+    mock_hass.states.state = XY_STATE
 
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
+    set_bridge(monkeypatch, mock_bridge)
+    await _handle_set_attributes(mock_hass, call)
 
     expected_xy = color_hs_to_xy(30.0, 80.0)
     mock_bridge.api.lights.set_state.assert_called_once_with(
         RESOURCE_ID,
-        brightness=None,
-        color_temp=None,
         color_xy=expected_xy,
     )
 
 
-@pytest.mark.asyncio
-async def test_rgb_color_on_color_light(mock_hass, mock_bridge):
+async def test_rgb_color_on_color_light(mock_hass, mock_bridge, monkeypatch):
     call = make_service_call({"entity_id": [ENTITY_ID], "rgb_color": [255, 128, 0]})
-    mock_hass.states.get.return_value = make_entity_state(supported_color_modes=["xy"])
+    mock_hass.states.state = XY_STATE
 
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
+    set_bridge(monkeypatch, mock_bridge)
+    await _handle_set_attributes(mock_hass, call)
 
     expected_xy = color_RGB_to_xy(255, 128, 0)
     mock_bridge.api.lights.set_state.assert_called_once_with(
         RESOURCE_ID,
-        brightness=None,
-        color_temp=None,
         color_xy=expected_xy,
     )
 
 
-@pytest.mark.asyncio
-async def test_color_on_non_color_light_skipped(mock_hass, mock_bridge):
+async def test_color_on_non_color_light_skipped(mock_hass, mock_bridge, monkeypatch):
     call = make_service_call({"entity_id": [ENTITY_ID], "xy_color": [0.3, 0.3]})
-    mock_hass.states.get.return_value = make_entity_state(supported_color_modes=["color_temp"])
+    mock_hass.states.state = make_entity_state(supported_color_modes=["color_temp"])
 
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
+    set_bridge(monkeypatch, mock_bridge)
+    await _handle_set_attributes(mock_hass, call)
 
     # Color not supported — nothing to send
     mock_bridge.api.lights.set_state.assert_not_called()
 
 
-@pytest.mark.asyncio
-async def test_color_on_non_color_light_with_brightness(mock_hass, mock_bridge):
+async def test_color_on_non_color_light_with_brightness(mock_hass, mock_bridge, monkeypatch):
     call = make_service_call({
         "entity_id": [ENTITY_ID],
         "xy_color": [0.3, 0.3],
         "brightness": 50,
     })
-    mock_hass.states.get.return_value = make_entity_state(supported_color_modes=["brightness"])
+    mock_hass.states.state = BRIGHTNESS_ONLY_STATE
 
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
+    set_bridge(monkeypatch, mock_bridge)
+    await _handle_set_attributes(mock_hass, call)
 
     # Color skipped, brightness still sent
     mock_bridge.api.lights.set_state.assert_called_once_with(
         RESOURCE_ID,
         brightness=50.0,
-        color_temp=None,
-        color_xy=None,
     )
 
 
-@pytest.mark.asyncio
-async def test_color_priority_rgb_wins_over_hs_and_xy(mock_hass, mock_bridge):
+async def test_color_priority_rgb_wins_over_hs_and_xy(mock_hass, mock_bridge, monkeypatch):
     expected_xy = color_RGB_to_xy(255, 128, 0)
     call = make_service_call({
         "entity_id": [ENTITY_ID],
@@ -336,56 +369,48 @@ async def test_color_priority_rgb_wins_over_hs_and_xy(mock_hass, mock_bridge):
         "hs_color": [30, 80],
         "xy_color": [0.3, 0.3],
     })
-    mock_hass.states.get.return_value = make_entity_state(supported_color_modes=["xy"])
+    mock_hass.states.state = XY_STATE
 
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
+    set_bridge(monkeypatch, mock_bridge)
+    await _handle_set_attributes(mock_hass, call)
 
     mock_bridge.api.lights.set_state.assert_called_once_with(
         RESOURCE_ID,
-        brightness=None,
-        color_temp=None,
         color_xy=expected_xy,
     )
 
 
-@pytest.mark.asyncio
-async def test_color_in_group(mock_hass, mock_bridge):
+async def test_color_in_group(mock_hass, mock_bridge, monkeypatch):
     call = make_service_call({"entity_id": [ENTITY_ID], "xy_color": [0.369, 0.445]})
-    mock_hass.states.get.return_value = make_entity_state(supported_color_modes=["xy"])
+    mock_hass.states.state = XY_STATE
 
-    light1 = MagicMock()
-    light1.id = "light-1"
-    light2 = MagicMock()
-    light2.id = "light-2"
-    mock_bridge.api.groups.grouped_light.get_lights.return_value = [light1, light2]
+    mock_bridge.api.groups.grouped_light.get_lights.return_value = [make_light("light-1"), make_light("light-2")]
 
-    with patch_bridge(mock_bridge, resource_type="grouped_light"):
-        await _handle_set_attributes(mock_hass, call)
+    set_bridge(monkeypatch, mock_bridge, resource_type="grouped_light")
+    await _handle_set_attributes(mock_hass, call)
 
     assert mock_bridge.api.lights.set_state.call_count == 2
     for c in mock_bridge.api.lights.set_state.call_args_list:
         assert c.kwargs["color_xy"] == (0.369, 0.445)
-        assert c.kwargs["color_temp"] is None
-        assert c.kwargs["brightness"] is None
+        assert "color_temp" not in c.kwargs
+        assert "brightness" not in c.kwargs
 
 
-@pytest.mark.asyncio
-async def test_brightness_ct_and_color_together(mock_hass, mock_bridge):
+async def test_brightness_ct_and_color_together(mock_hass, mock_bridge, monkeypatch):
     call = make_service_call({
         "entity_id": [ENTITY_ID],
         "brightness": 60,
         "color_temp_kelvin": 3000,
         "xy_color": [0.4, 0.4],
     })
-    mock_hass.states.get.return_value = make_entity_state(
+    mock_hass.states.state = make_entity_state(
         supported_color_modes=["color_temp", "xy"],
         min_color_temp_kelvin=2202,
         max_color_temp_kelvin=6535,
     )
 
-    with patch_bridge(mock_bridge):
-        await _handle_set_attributes(mock_hass, call)
+    set_bridge(monkeypatch, mock_bridge)
+    await _handle_set_attributes(mock_hass, call)
 
     mock_bridge.api.lights.set_state.assert_called_once_with(
         RESOURCE_ID,
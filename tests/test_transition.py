@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from custom_components.hue_dimmer import (
+    CacheEntry,
+    _brightness_cache,
+    _cache_brightness,
+    _start_transition,
+)
+from custom_components.hue_dimmer.const import DIR_NONE, DIR_UP
+from tests.conftest import ENTITY_ID, RESOURCE_ID
+
+
+async def _raise(hass, bridge, limit=100.0):
+    await _start_transition(hass, bridge, "light", RESOURCE_ID, ENTITY_ID, DIR_UP, 5.0, limit)
+
+
+async def test_duplicate_transition_coalesced(mock_hass, mock_bridge):
+    await _raise(mock_hass, mock_bridge)
+    await _raise(mock_hass, mock_bridge)
+
+    mock_bridge.api.lights.set_state.assert_awaited_once()
+
+
+async def test_different_limit_not_coalesced(mock_hass, mock_bridge):
+    await _raise(mock_hass, mock_bridge, limit=100.0)
+    await _raise(mock_hass, mock_bridge, limit=80.0)
+
+    assert mock_bridge.api.lights.set_state.await_count == 2
+    assert mock_bridge.api.lights.set_state.call_args.kwargs["brightness"] == 80.0
+
+
+async def test_failed_transition_lets_retry_through(mock_hass, mock_bridge):
+    mock_bridge.api.lights.set_state.side_effect = [Exception("Bridge unreachable"), None]
+
+    with pytest.raises(Exception, match="Bridge unreachable"):
+        await _raise(mock_hass, mock_bridge)
+    assert ENTITY_ID not in _brightness_cache
+
+    await _raise(mock_hass, mock_bridge)
+    assert mock_bridge.api.lights.set_state.await_count == 2
+    assert _brightness_cache[ENTITY_ID].target == 100.0
+
+
+async def test_failed_transition_keeps_newer_entry(mock_hass, mock_bridge):
+    stopped = CacheEntry(0.0, 40.0, 40.0, DIR_NONE, 1.0)
+
+    # A stop for the same light completes while the raise is still in flight, then the raise fails
+    async def _set_state(*args, **kwargs):
+        _cache_brightness(ENTITY_ID, stopped)
+        raise Exception("Bridge unreachable")
+
+    mock_bridge.api.lights.set_state.side_effect = _set_state
+
+    with pytest.raises(Exception, match="Bridge unreachable"):
+        await _raise(mock_hass, mock_bridge)
+    assert _brightness_cache[ENTITY_ID] is stopped
+
+
+@pytest.mark.parametrize(
+    ("current", "sent"),
+    [
+        pytest.param(99.65, False, id="0.35"),
+        pytest.param(99.64, False, id="0.36"),
+        pytest.param(99.6, True, id="0.4"),
+    ],
+)
+async def test_min_step_threshold(mock_hass, mock_bridge, current, sent):
+    # Hue's smallest brightness step is 0.4%; anything shorter isn't worth a PUT
+    _cache_brightness(ENTITY_ID, CacheEntry(time.monotonic(), current, current, DIR_NONE, 1.0))
+
+    await _raise(mock_hass, mock_bridge)
+
+    assert mock_bridge.api.lights.set_state.called is sent